@@ -7,33 +7,74 @@ This script provides CLI access to Google Places API for:
 2. Fetching reviews for a specific place
 
 It loads the API key from environment variables and makes authenticated requests.
+
+Requirements:
+    pip install requests python-dotenv orjson
 """
 
 import os
-import json
+import orjson
 import requests
 import argparse
 import sys
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional
+from urllib3.util.retry import Retry
+
+
+# Transient failures (rate limiting, 5xx, dropped connections) are retried with backoff.
+# raise_on_status=False hands the last response to raise_for_status so its body gets logged.
+_RETRY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET", "POST"],
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+# Shared session so repeated calls to places.googleapis.com reuse keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=_RETRY))
+
+
+def _json(response: requests.Response) -> Dict:
+    """Parse a JSON response body with orjson (skips requests' encoding detection)."""
+    return orjson.loads(response.content)
+
+
+_DOTENV_LOADED = False
+_API_KEY = None
 
 
 def load_api_key() -> str:
-    """Load the Google Places API key from environment variables."""
-    load_dotenv()
+    """
+    Load the Google Places API key from environment variables and attach it to the shared session.
+    The .env file is read at most once and the key is cached for later calls.
+    """
+    global _DOTENV_LOADED, _API_KEY
+    if _API_KEY:
+        return _API_KEY
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
     api_key = os.getenv('GOOGLE_PLACES_API_KEY')
     if not api_key:
         raise ValueError("GOOGLE_PLACES_API_KEY not found in environment variables")
-    return api_key
+    _SESSION.headers.update({'X-Goog-Api-Key': api_key})
+    _API_KEY = api_key
+    return _API_KEY
 
 
-def search_places(text_query: str, api_key: str) -> Dict:
+def search_places(text_query: str) -> Dict:
     """
     Search for places using Google Places API text search.
+    Requires load_api_key() to have been called first.
     
     Args:
         text_query: The text query to search for (e.g., "Starbucks in New York")
-        api_key: The Google Places API key
         
     Returns:
         Dictionary containing the API response with search results
@@ -41,8 +82,6 @@ def search_places(text_query: str, api_key: str) -> Dict:
     url = "https://places.googleapis.com/v1/places:searchText"
     
     headers = {
-        'Content-Type': 'application/json',
-        'X-Goog-Api-Key': api_key,
         'X-Goog-FieldMask': 'places.id,places.displayName,places.formattedAddress'
     }
     
@@ -51,9 +90,9 @@ def search_places(text_query: str, api_key: str) -> Dict:
     }
     
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = _SESSION.post(url, headers=headers, json=payload)
         response.raise_for_status()
-        return response.json()
+        return _json(response)
     except requests.exceptions.RequestException as e:
         print(f"Error searching places: {e}")
         if hasattr(e, 'response') and e.response is not None:
@@ -62,13 +101,13 @@ def search_places(text_query: str, api_key: str) -> Dict:
         raise
 
 
-def fetch_place_reviews(place_id: str, api_key: str) -> Dict:
+def fetch_place_reviews(place_id: str) -> Dict:
     """
     Fetch reviews for a specific place using Google Places API.
+    Requires load_api_key() to have been called first.
     
     Args:
         place_id: The Google Places ID for the location
-        api_key: The Google Places API key
         
     Returns:
         Dictionary containing the API response with place details and reviews
@@ -76,15 +115,13 @@ def fetch_place_reviews(place_id: str, api_key: str) -> Dict:
     url = f"https://places.googleapis.com/v1/places/{place_id}"
     
     headers = {
-        'Content-Type': 'application/json',
-        'X-Goog-Api-Key': api_key,
         'X-Goog-FieldMask': 'id,displayName,reviews'
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = _SESSION.get(url, headers=headers)
         response.raise_for_status()
-        return response.json()
+        return _json(response)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching reviews: {e}")
         if hasattr(e, 'response') and e.response is not None:
@@ -173,9 +210,12 @@ Examples:
   python review_fetch.py reviews ChIJN1t_tDeuEmsRUsoyG83frY4
   python review_fetch.py reviews --place-id ChIJN1t_tDeuEmsRUsoyG83frY4
   
-  # Save results to file
+  # Save results to file (appended to search_results.jsonl / reviews.jsonl)
   python review_fetch.py search "Coffee shop" --save
   python review_fetch.py reviews ChIJN1t_tDeuEmsRUsoyG83frY4 --save
+  
+  # Save an indented JSON file per query/place instead
+  python review_fetch.py search "Coffee shop" --save --pretty
         """
     )
     
@@ -184,12 +224,14 @@ Examples:
     # Search command
     search_parser = subparsers.add_parser('search', help='Search for places')
     search_parser.add_argument('query', help='Text query to search for (e.g., "Starbucks in New York")')
-    search_parser.add_argument('--save', action='store_true', help='Save results to JSON file')
+    search_parser.add_argument('--save', action='store_true', help='Append results to search_results.jsonl')
+    search_parser.add_argument('--pretty', action='store_true', help='With --save, write an indented per-query JSON file instead')
     
     # Reviews command
     reviews_parser = subparsers.add_parser('reviews', help='Fetch reviews for a place')
     reviews_parser.add_argument('place_id', help='Google Place ID')
-    reviews_parser.add_argument('--save', action='store_true', help='Save results to JSON file')
+    reviews_parser.add_argument('--save', action='store_true', help='Append results to reviews.jsonl')
+    reviews_parser.add_argument('--pretty', action='store_true', help='With --save, write an indented per-place JSON file instead')
     
     return parser.parse_args()
 
@@ -205,31 +247,41 @@ def main():
     
     try:
         # Load API key from environment
-        api_key = load_api_key()
+        load_api_key()
         print("✓ API key loaded successfully")
         
         if args.command == 'search':
             print(f"Searching for: {args.query}")
-            search_data = search_places(args.query, api_key)
+            search_data = search_places(args.query)
             display_search_results(search_data)
             
-            if args.save:
+            if args.save and args.pretty:
                 filename = f"search_results_{args.query.replace(' ', '_').replace(',', '')}.json"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(search_data, f, indent=2, ensure_ascii=False)
+                with open(filename, 'wb') as f:
+                    f.write(orjson.dumps(search_data, option=orjson.OPT_INDENT_2))
                 print(f"✓ Search results saved to {filename}")
+            elif args.save:
+                filename = "search_results.jsonl"
+                with open(filename, 'ab') as f:
+                    f.write(orjson.dumps(search_data) + b"\n")
+                print(f"✓ Search results appended to {filename}")
         
         elif args.command == 'reviews':
             print(f"Fetching reviews for place ID: {args.place_id}")
-            place_data = fetch_place_reviews(args.place_id, api_key)
+            place_data = fetch_place_reviews(args.place_id)
             display_reviews(place_data)
             
-            if args.save:
+            if args.save and args.pretty:
                 place_name = place_data.get('displayName', 'unknown').replace(' ', '_')
                 filename = f"reviews_{args.place_id}_{place_name}.json"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(place_data, f, indent=2, ensure_ascii=False)
+                with open(filename, 'wb') as f:
+                    f.write(orjson.dumps(place_data, option=orjson.OPT_INDENT_2))
                 print(f"✓ Reviews saved to {filename}")
+            elif args.save:
+                filename = "reviews.jsonl"
+                with open(filename, 'ab') as f:
+                    f.write(orjson.dumps(place_data) + b"\n")
+                print(f"✓ Reviews appended to {filename}")
         
     except ValueError as e:
         print(f"Configuration error: {e}")
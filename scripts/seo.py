@@ -1,8 +1,25 @@
-import requests
+"""
+Gumloop SEO pipeline CLI Tool
+
+This script starts the Gumloop SEO analysis pipeline for a URL, polls the run
+until it finishes and saves the JSON result and markdown report.
+
+Requirements:
+    pip install "httpx[http2]" aiolimiter orjson
+"""
+
+import asyncio
+import hashlib
+import httpx
+import io
+import sys
 import time
 import json
+import orjson
 import os
-from urllib.parse import urlparse
+import re
+from aiolimiter import AsyncLimiter
+from urllib.parse import urlsplit
 
 USER_ID = "5f9T1QuvWvbnkogeUqfk7lmUpsm1"
 SAVED_ITEM_ID = "ujef8PYUuWgAtDcYR43aNF"
@@ -10,14 +27,91 @@ API_KEY = "1facf19033a348ffb0724746338ef0cb"
 
 FOCUS_AREA = "Content Optimization (Hero, Services, Header, Meta, FAQ, CTAs, etc.)"
 
+# Default headers for the shared httpx.AsyncClient created in run_command()
+_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "Authorization": f"Bearer {API_KEY}"
+}
+
+# HTTP/2 multiplexes concurrent polls over a single TLS connection to api.gumloop.com
+_CLIENT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+_CLIENT_TIMEOUT = httpx.Timeout(60.0)
+
+# Upper bound for the poll delay while backing off after errors
+MAX_BACKOFF = 60
+
+# Upper bound for the poll interval while a run stays RUNNING without new logs
+MAX_POLL_INTERVAL = 30
+
+# Characters in a domain replaced with underscores when naming its output directory
+_URLSAFE_TABLE = str.maketrans({'.': '_', '-': '_'})
+
+# Matches ANSI color/style escape sequences in Gumloop run logs
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
+# Gumloop doesn't publish a per-key quota; stay just under 3 requests/second
+_GUMLOOP_LIM = AsyncLimiter(2.9, 1)
+
+# Responses that are retried (honouring Retry-After) before being handed back
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_ERRORS = (httpx.TransportError,)
+MAX_RETRIES = 5
+
+# Retries that are safe for non-idempotent calls: the request was rejected or never sent
+SAFE_RETRY_STATUSES = (429,)
+SAFE_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _retry_after_seconds(value: str):
+    """Parse a Retry-After header given in seconds; HTTP-date values return None."""
+    try:
+        return max(float(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json(response: httpx.Response) -> dict:
+    """Parse a JSON response body with orjson."""
+    return orjson.loads(response.content)
+
+
+async def _gumloop_request(client: httpx.AsyncClient, method: str, url: str,
+                           idempotent: bool = False, **kwargs) -> httpx.Response:
+    """
+    Send a rate-limited request to Gumloop and return the response.
+    Only 429s and requests that never reached the server are retried, unless the
+    caller passes idempotent=True to also retry 5xx responses and any transport
+    error. Retries wait for Retry-After (or a doubling backoff).
+    """
+    retry_statuses = RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+    retry_errors = RETRY_ERRORS if idempotent else SAFE_RETRY_ERRORS
+    backoff = 1
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with _GUMLOOP_LIM:
+                response = await client.request(method, url, **kwargs)
+        except retry_errors as e:
+            if attempt == MAX_RETRIES:
+                raise
+            print(f"⏳ Gumloop request failed ({e!r}), retrying in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            continue
+        if response.status_code in retry_statuses and attempt < MAX_RETRIES:
+            wait = _retry_after_seconds(response.headers.get("Retry-After")) or backoff
+            print(f"⏳ Gumloop returned {response.status_code}, retrying in {wait}s")
+            await asyncio.sleep(wait)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            continue
+        return response
+
 
 def get_url_directory_name(url: str):
     """Extract a clean directory name from URL"""
-    parsed = urlparse(url)
-    domain = parsed.netloc.replace('www.', '')
+    domain = urlsplit(url).netloc.removeprefix('www.')
     # Replace dots and other special chars with underscores
-    clean_domain = domain.replace('.', '_').replace('-', '_')
-    return clean_domain
+    return domain.translate(_URLSAFE_TABLE)
 
 
 def create_url_directory(url: str):
@@ -28,152 +122,226 @@ def create_url_directory(url: str):
     return files_dir
 
 
-def save_results_to_files(result: dict, url: str):
-    """Save both JSON results and markdown content to organized file structure"""
+def save_results_to_files(result: dict, url: str, pretty: bool = False):
+    """
+    Save both JSON results and markdown content to organized file structure.
+    JSON is appended to results.jsonl, or written indented to result.json when pretty is set.
+    """
     files_dir = create_url_directory(url)
     
     # Save JSON results
-    json_path = os.path.join(files_dir, "result.json")
     try:
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        if pretty:
+            json_path = os.path.join(files_dir, "result.json")
+            with open(json_path, 'wb') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        else:
+            json_path = os.path.join(files_dir, "results.jsonl")
+            with open(json_path, 'ab') as f:
+                f.write(orjson.dumps(result) + b"\n")
         print(f"💾 JSON results saved to: {json_path}")
     except Exception as e:
         print(f"❌ Error saving JSON file: {e}")
     
     # Save markdown content if available
-    outputs = result.get("outputs", {})
-    markdown_content = outputs.get("output", "")
-    
-    if markdown_content and (markdown_content.strip().startswith('#') or '##' in markdown_content):
-        md_path = os.path.join(files_dir, "content.md")
-        try:
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-            print(f"💾 Markdown content saved to: {md_path}")
-        except Exception as e:
-            print(f"❌ Error saving markdown file: {e}")
+    markdown_content = result.get("outputs", {}).get("output", "")
+    if is_markdown(markdown_content):
+        save_markdown_output(result=result, output_content=markdown_content, url=url)
     else:
         print("⚠️  No markdown content found to save")
 
 
-def start_pipeline(url: str):
-    url = f"https://api.gumloop.com/api/v1/start_pipeline?user_id={USER_ID}&saved_item_id={SAVED_ITEM_ID}"
+async def start_pipeline(client: httpx.AsyncClient, url: str):
+    api_url = f"https://api.gumloop.com/api/v1/start_pipeline?user_id={USER_ID}&saved_item_id={SAVED_ITEM_ID}"
     payload = {"url":url, "focus_area":FOCUS_AREA}
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
-    }
-    response = requests.request("POST", url, json=payload, headers=headers)
-    return response.json()
+    # Not idempotent: a retried POST could start (and bill) a second run
+    response = await _gumloop_request(client, "POST", api_url, json=payload)
+    return _json(response)
 
 
-def get_run_result(run_id: str):
+async def get_run_result(client: httpx.AsyncClient, run_id: str):
     url = f"https://api.gumloop.com/api/v1/get_pl_run?user_id={USER_ID}&run_id={run_id}"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}"
-    }
-    response = requests.request("GET", url, headers=headers)
-    return response.json()
+    response = await _gumloop_request(client, "GET", url, idempotent=True)
+    response.raise_for_status()
+    return _json(response)
 
 
-def poll_job_status(run_id: str, poll_interval: int = 2, url: str = None):
+class RunResultFetcher:
     """
-    Poll job status every poll_interval seconds until completion.
+    Fetch a run's result repeatedly, skipping work when it hasn't changed.
+    Sends If-None-Match / If-Modified-Since from the previous response and reuses
+    the cached body on 304. Servers that don't send validators are handled by
+    hashing the raw body, so an identical payload is not parsed again.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, run_id: str):
+        self.client = client
+        self.url = f"https://api.gumloop.com/api/v1/get_pl_run?user_id={USER_ID}&run_id={run_id}"
+        self.changed = True
+        self._etag = None
+        self._last_modified = None
+        self._last_hash = None
+        self._last_body = None
+
+    async def fetch(self) -> dict:
+        headers = {}
+        if self._last_body is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        response = await _gumloop_request(self.client, "GET", self.url, idempotent=True, headers=headers)
+        if response.status_code == 304 and self._last_body is not None:
+            self.changed = False
+            return self._last_body
+        response.raise_for_status()
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        raw = response.content
+
+        body_hash = hashlib.sha256(raw).digest()
+        self.changed = body_hash != self._last_hash
+        if self.changed:
+            self._last_hash = body_hash
+            self._last_body = orjson.loads(raw)
+        return self._last_body
+
+
+def _write_output(buf: io.StringIO) -> None:
+    """Write buffered output to stdout in one call and clear the buffer."""
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
+    buf.seek(0)
+    buf.truncate()
+
+
+async def poll_job_status(client: httpx.AsyncClient, run_id: str, poll_interval: int = 2, url: str = None,
+                          pretty: bool = False):
+    """
+    Poll job status until completion, starting every poll_interval seconds.
     Pretty prints the output when the job is done.
     If url is provided, saves results to organized file structure.
+    While the run stays RUNNING with no new log entries the interval grows 1.5x
+    (up to MAX_POLL_INTERVAL, or poll_interval if that is larger); it resets to poll_interval when the state or logs change.
+    On errors the delay doubles (up to MAX_BACKOFF) and resets after the next successful poll.
+    Output for each poll is buffered and written to stdout in one call.
     """
+    max_interval = max(MAX_POLL_INTERVAL, poll_interval)
     print(f"Polling job status for run_id: {run_id}")
-    print(f"Checking every {poll_interval} seconds...")
+    print(f"Checking every {poll_interval} seconds (up to {max_interval}s while idle)...")
     print("-" * 50)
     
+    fetcher = RunResultFetcher(client, run_id)
+    interval = poll_interval
+    delay = poll_interval
+    prev_state = None
+    prev_log_count = 0
     while True:
+        out = io.StringIO()
         try:
-            result = get_run_result(run_id)
+            result = await fetcher.fetch()
             state = result.get("state", "UNKNOWN")
+            log_count = len(result.get("log", []))
             
-            print(f"[{time.strftime('%H:%M:%S')}] Job state: {state}")
+            if state == prev_state == "RUNNING" and log_count == prev_log_count:
+                interval = min(interval * 1.5, max_interval)
+            else:
+                interval = poll_interval
+            prev_state = state
+            prev_log_count = log_count
+            delay = interval
+            
+            print(f"[{time.strftime('%H:%M:%S')}] Job state: {state}", file=out)
             
             if state == "DONE":
-                print("\n" + "="*60)
-                print("JOB COMPLETED SUCCESSFULLY!")
-                print("="*60)
+                print("\n" + "="*60, file=out)
+                print("JOB COMPLETED SUCCESSFULLY!", file=out)
+                print("="*60, file=out)
                 
                 # Save results to organized file structure if URL is provided
                 if url:
-                    print("\n💾 Saving results to organized file structure...")
-                    save_results_to_files(result, url)
+                    print("\n💾 Saving results to organized file structure...", file=out)
+                    _write_output(out)
+                    save_results_to_files(result, url, pretty)
                 
                 outputs = result.get("outputs", {})
                 if outputs:
-                    print("\n📊 OUTPUTS:")
-                    print("-" * 30)
+                    print("\n📊 OUTPUTS:", file=out)
+                    print("-" * 30, file=out)
                     for key, value in outputs.items():
-                        print(f"\n🔑 {key}:")
+                        print(f"\n🔑 {key}:", file=out)
                         if isinstance(value, str):
                             # Pretty print string output
-                            print(value)
+                            print(value, file=out)
                         else:
                             # Pretty print JSON output
-                            print(json.dumps(value, indent=2))
+                            print(json.dumps(value, indent=2), file=out)
                 else:
-                    print("\n⚠️  No outputs found in the result")
+                    print("\n⚠️  No outputs found in the result", file=out)
                 
                 # Also show some job statistics
-                print(f"\n📈 JOB STATISTICS:")
-                print(f"   • Credit Cost: {result.get('credit_cost', 'N/A')}")
-                print(f"   • Child Run Credit Cost: {result.get('child_run_credit_cost', 'N/A')}")
-                print(f"   • Node Executions: {result.get('node_executions', 'N/A')}")
-                print(f"   • Created: {result.get('created_ts', 'N/A')}")
-                print(f"   • Finished: {result.get('finished_ts', 'N/A')}")
+                print(f"\n📈 JOB STATISTICS:", file=out)
+                print(f"   • Credit Cost: {result.get('credit_cost', 'N/A')}", file=out)
+                print(f"   • Child Run Credit Cost: {result.get('child_run_credit_cost', 'N/A')}", file=out)
+                print(f"   • Node Executions: {result.get('node_executions', 'N/A')}", file=out)
+                print(f"   • Created: {result.get('created_ts', 'N/A')}", file=out)
+                print(f"   • Finished: {result.get('finished_ts', 'N/A')}", file=out)
                 
                 break
                 
             elif state == "FAILED":
-                print("\n" + "="*60)
-                print("❌ JOB FAILED!")
-                print("="*60)
-                print(f"Error details: {result}")
+                print("\n" + "="*60, file=out)
+                print("❌ JOB FAILED!", file=out)
+                print("="*60, file=out)
+                print(f"Error details: {result}", file=out)
                 break
                 
             elif state == "RUNNING":
-                # Show progress from logs if available
-                logs = result.get("log", [])
+                # Show progress from logs if available (skipped when the result is unchanged)
+                logs = result.get("log", []) if fetcher.changed else []
                 if logs:
                     recent_logs = logs[-3:]  # Show last 3 log entries
-                    print("   Recent activity:")
-                    for log_entry in recent_logs:
-                        # Clean up ANSI escape codes for better readability
-                        clean_log = log_entry.replace('\x1b[34m', '').replace('\x1b[32m', '').replace('\x1b[0m', '')
-                        if '__system__:' in clean_log:
-                            continue  # Skip system logs
-                        print(f"     • {clean_log}")
+                    print("   Recent activity:", file=out)
+                    # Skip system logs before paying for ANSI cleanup
+                    user_logs = [entry for entry in recent_logs if '__system__:' not in entry]
+                    if user_logs:
+                        # Clean up ANSI escape codes for better readability (one pass over all entries)
+                        print(_ANSI_RE.sub('', "\n".join(f"     • {entry}" for entry in user_logs)), file=out)
                 
             else:
-                print(f"   Unknown state: {state}")
-            
-            time.sleep(poll_interval)
+                print(f"   Unknown state: {state}", file=out)
             
-        except KeyboardInterrupt:
-            print("\n\n⏹️  Polling interrupted by user")
-            break
         except Exception as e:
-            print(f"\n❌ Error polling job status: {e}")
-            time.sleep(poll_interval)
+            delay = min(delay * 2, MAX_BACKOFF)
+            print(f"\n❌ Error polling job status: {e} (retrying in {delay}s)", file=out)
+        finally:
+            _write_output(out)
+        
+        await asyncio.sleep(delay)
 
 
-def save_markdown_output(run_id: str, output_content: str = None, url: str = None):
+def is_markdown(content: str) -> bool:
+    """Return True if a run output looks like a markdown report."""
+    return bool(content) and (content.strip().startswith('#') or '##' in content)
+
+
+def save_markdown_output(run_id: str = None, output_content: str = None, url: str = None, *, result: dict = None):
     """
     Save markdown output from a completed job to a file.
-    If output_content is not provided, fetches the latest result.
-    If url is provided, saves to organized file structure.
+    If output_content is not provided, it is taken from the already-fetched result;
+    one of the two is required (fetch the run with get_run_result() first).
+    If url is provided, saves to organized file structure; otherwise to <run_id>.md.
     """
     if output_content is None:
-        result = get_run_result(run_id)
+        if result is None:
+            raise ValueError("save_markdown_output needs result or output_content; fetch the run with get_run_result() first")
         outputs = result.get("outputs", {})
         output_content = outputs.get("output", "")
+    if run_id is None and result is not None:
+        run_id = result.get("run_id", "output")
     
-    if not output_content or not (output_content.strip().startswith('#') or '##' in output_content):
+    if not is_markdown(output_content):
         print("❌ No markdown content found in outputs")
         return None
     
@@ -186,8 +354,8 @@ def save_markdown_output(run_id: str, output_content: str = None, url: str = Non
         filename = f"{run_id}.md"
     
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(output_content)
+        with open(filename, 'wb') as f:
+            f.write(output_content.encode('utf-8'))
         print(f"💾 Markdown report saved to: {filename}")
         return filename
     except Exception as e:
@@ -196,7 +364,33 @@ def save_markdown_output(run_id: str, output_content: str = None, url: str = Non
 
 
 import argparse
-import sys
+
+async def run_command(args):
+    """Run a parsed CLI command with one shared HTTP/2 client."""
+    async with httpx.AsyncClient(http2=True, headers=_HEADERS, limits=_CLIENT_LIMITS,
+                                 timeout=_CLIENT_TIMEOUT) as client:
+        if args.command == 'run':
+            result = await start_pipeline(client, args.url)
+            run_id = result.get("run_id")
+            if run_id:
+                print(f"Pipeline started with run_id: {run_id}")
+                if args.poll:
+                    print("\nStarting automatic polling...")
+                    await poll_job_status(client, run_id, url=args.url, pretty=args.pretty)
+                else:
+                    print(f"Use 'python seo.py poll {run_id} --url {args.url}' to monitor progress")
+            else:
+                print("Failed to retrieve run_id. Response:", result)
+                sys.exit(1)
+        elif args.command == 'results':
+            result = await get_run_result(client, args.run_id)
+            print(result)
+        elif args.command == 'poll':
+            await poll_job_status(client, args.run_id, args.interval, args.url, args.pretty)
+        elif args.command == 'save':
+            result = await get_run_result(client, args.run_id)
+            save_markdown_output(result=result, run_id=args.run_id, url=args.url)
+
 
 def main():
     parser = argparse.ArgumentParser(description='SEO Pipeline CLI')
@@ -206,6 +400,7 @@ def main():
     run_parser = subparsers.add_parser('run', help='Start pipeline with a URL')
     run_parser.add_argument('url', type=str, help='URL to process')
     run_parser.add_argument('--poll', action='store_true', help='Automatically poll for results after starting')
+    run_parser.add_argument('--pretty', action='store_true', help='Save an indented result.json instead of appending to results.jsonl')
 
     # 'results' command to get results with run id
     results_parser = subparsers.add_parser('results', help='Get results for a given run ID')
@@ -216,6 +411,7 @@ def main():
     poll_parser.add_argument('run_id', type=str, help='Run ID to poll')
     poll_parser.add_argument('--interval', type=int, default=2, help='Polling interval in seconds (default: 2)')
     poll_parser.add_argument('--url', type=str, help='URL to organize files by domain')
+    poll_parser.add_argument('--pretty', action='store_true', help='Save an indented result.json instead of appending to results.jsonl')
 
     # 'save' command to save markdown output
     save_parser = subparsers.add_parser('save', help='Save markdown output from completed job')
@@ -224,28 +420,10 @@ def main():
 
     args = parser.parse_args()
 
-    if args.command == 'run':
-        result = start_pipeline(args.url)
-        run_id = result.get("run_id")
-        if run_id:
-            print(f"Pipeline started with run_id: {run_id}")
-            if args.poll:
-                print("\nStarting automatic polling...")
-                poll_job_status(run_id, url=args.url)
-            else:
-                print(f"Use 'python seo.py poll {run_id} --url {args.url}' to monitor progress")
-        else:
-            print("Failed to retrieve run_id. Response:", result)
-            sys.exit(1)
-    elif args.command == 'results':
-        result = get_run_result(args.run_id)
-        print(result)
-    elif args.command == 'poll':
-        poll_job_status(args.run_id, args.interval, args.url)
-    elif args.command == 'save':
-        save_markdown_output(args.run_id, url=args.url)
-    else:
-        parser.print_help()
+    try:
+        asyncio.run(run_command(args))
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Polling interrupted by user")
 
 if __name__ == '__main__':
     main()
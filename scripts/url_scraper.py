@@ -7,53 +7,145 @@ This script provides CLI access to Firecrawl API for:
 2. Taking screenshots of web pages
 3. Getting both markdown and screenshots in one request
 
+Several URLs can be scraped in one invocation; they are fetched concurrently.
+
 It loads the API key from environment variables and makes authenticated requests.
+
+Requirements:
+    pip install "httpx[http2]" aiolimiter orjson python-dotenv
 """
 
 import os
-import json
-import requests
+import orjson
+import httpx
+import asyncio
 import argparse
 import sys
+import time
 import base64
+import hashlib
+from aiolimiter import AsyncLimiter
 from dotenv import load_dotenv
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
+FIRECRAWL_SCRAPE_URL = "https://api.firecrawl.dev/v2/scrape"
+
+# Characters in a URL replaced with underscores when naming its output directory
+_URLSAFE_TABLE = str.maketrans({'/': '_', '.': '_', ':': '_'})
+
+# Default number of URLs scraped at the same time
+DEFAULT_CONCURRENCY = 10
+
+# Base64 characters decoded per write when saving inline screenshots (multiple of 4)
+BASE64_CHUNK_SIZE = 1 << 20
+
+# Bytes read per chunk when streaming screenshot downloads
+DOWNLOAD_CHUNK_SIZE = 65536
+
+# HTTP/2 lets concurrent scrapes share one TLS connection to api.firecrawl.dev
+_CLIENT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+# Scrapes wait for the page to render server-side, so allow well beyond --wait-for
+_CLIENT_TIMEOUT = httpx.Timeout(120.0)
+
+# Firecrawl's Hobby plan allows 100 scrapes/minute; stay slightly under it
+_FIRECRAWL_LIM = AsyncLimiter(95, 60)
+
+# Responses that are retried (honouring Retry-After) before being handed back
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_ERRORS = (httpx.TransportError,)
+MAX_RETRIES = 5
+
+# Retries that are safe for non-idempotent calls: the request was rejected or never sent
+SAFE_RETRY_STATUSES = (429,)
+SAFE_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MAX_BACKOFF = 60
+
+
+def _retry_after_seconds(value: str) -> Optional[float]:
+    """Parse a Retry-After header given in seconds; HTTP-date values return None."""
+    try:
+        return max(float(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json(response: httpx.Response) -> Dict:
+    """Parse a JSON response body with orjson."""
+    return orjson.loads(response.content)
+
+
+async def _firecrawl_request(client: httpx.AsyncClient, method: str, url: str,
+                             idempotent: bool = False, **kwargs) -> httpx.Response:
+    """
+    Send a rate-limited request to Firecrawl and return the response.
+    Only 429s and requests that never reached the server are retried, unless the
+    caller passes idempotent=True to also retry 5xx responses and any transport
+    error. Retries wait for Retry-After (or a doubling backoff).
+    """
+    retry_statuses = RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+    retry_errors = RETRY_ERRORS if idempotent else SAFE_RETRY_ERRORS
+    backoff = 1
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with _FIRECRAWL_LIM:
+                response = await client.request(method, url, **kwargs)
+        except retry_errors as e:
+            if attempt == MAX_RETRIES:
+                raise
+            print(f"⏳ Firecrawl request failed ({e!r}), retrying in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            continue
+        if response.status_code in retry_statuses and attempt < MAX_RETRIES:
+            wait = _retry_after_seconds(response.headers.get("Retry-After")) or backoff
+            print(f"⏳ Firecrawl returned {response.status_code}, retrying in {wait}s")
+            await asyncio.sleep(wait)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+            continue
+        return response
+
+
+_DOTENV_LOADED = False
+_API_KEY = None
+
+
 def load_api_key() -> str:
-    """Load the Firecrawl API key from environment variables."""
-    load_dotenv()
+    """
+    Load the Firecrawl API key from environment variables.
+    The .env file is read at most once and the key is cached for later calls.
+    """
+    global _DOTENV_LOADED, _API_KEY
+    if _API_KEY:
+        return _API_KEY
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
     api_key = os.getenv('FIRECRAWL_API_KEY')
     if not api_key:
         raise ValueError("FIRECRAWL_API_KEY not found in environment variables")
-    return api_key
+    _API_KEY = api_key
+    return _API_KEY
 
 
-def scrape_url(url: str, api_key: str, only_main_content: bool = False, 
-               max_age: int = 172800000, wait_for: int = 5, 
-               formats: list = None) -> Dict:
+async def scrape_url(client: httpx.AsyncClient, url: str,
+                     only_main_content: bool = False, max_age: int = 172800000,
+                     wait_for: int = 5, formats: list = None) -> Dict:
     """
     Scrape a URL using Firecrawl API.
     
     Args:
+        client: The Firecrawl client (carries the Authorization header)
         url: The URL to scrape
-        api_key: The Firecrawl API key
         only_main_content: Whether to extract only main content
         max_age: Maximum age of cached content in milliseconds
         wait_for: Time to wait for page load in seconds
         formats: List of formats to extract (markdown, screenshot, etc.)
-        
+    
     Returns:
         Dictionary containing the API response with scraped content
     """
-    firecrawl_url = "https://api.firecrawl.dev/v2/scrape"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
     if formats is None:
         formats = ["markdown"]
     
@@ -66,48 +158,116 @@ def scrape_url(url: str, api_key: str, only_main_content: bool = False,
         "waitFor": wait_for
     }
     
+    # Not idempotent: a retried POST after a timeout or 5xx could be charged as a second scrape
+    response = await _firecrawl_request(client, "POST", FIRECRAWL_SCRAPE_URL, json=payload)
+    if response.status_code >= 400:
+        print(f"Error scraping URL: {url}")
+        print(f"Response status: {response.status_code}")
+        print(f"Response content: {response.text}")
+    response.raise_for_status()
+    return _json(response)
+
+
+def wants_screenshot(formats: list) -> bool:
+    """Return True if the requested formats include a screenshot."""
+    return any(isinstance(f, dict) and f.get('type') == 'screenshot' for f in formats)
+
+
+def cache_key(url: str, formats: list, only_main_content: bool) -> str:
+    """Build the local cache key for a scrape request."""
+    formats_key = orjson.dumps(formats, option=orjson.OPT_SORT_KEYS).decode()
+    return hashlib.sha256(f"{url}|{formats_key}|{only_main_content}".encode()).hexdigest()
+
+
+def load_cached_scrape(cache_dir: str, key: str, max_age: int) -> Optional[Dict]:
+    """
+    Return a cached scrape response if one exists and is younger than max_age.
+    
+    Args:
+        cache_dir: Directory holding cache entries
+        key: Cache key from cache_key()
+        max_age: Maximum age of cached content in milliseconds
+    """
+    cache_path = os.path.join(cache_dir, f"{key}.json")
     try:
-        response = requests.post(firecrawl_url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error scraping URL: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"Response status: {e.response.status_code}")
-            print(f"Response content: {e.response.text}")
-        raise
-
-
-def save_screenshot(screenshot_data: str, filename: str) -> None:
+        with open(cache_path, 'rb') as f:
+            entry = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if time.time() - entry.get("ts", 0) < max_age / 1000:
+        return entry.get("data")
+    return None
+
+
+def store_cached_scrape(cache_dir: str, key: str, scrape_data: Dict) -> None:
+    """Store a successful scrape response in the local cache."""
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{key}.json")
+    with open(cache_path, 'wb') as f:
+        f.write(orjson.dumps({"ts": time.time(), "data": scrape_data}))
+
+
+def write_base64_file(filename: str, b64_data: str) -> None:
+    """Decode base64 data to a file in fixed-size chunks so the whole image is never held decoded."""
+    with open(filename, 'wb') as f:
+        for i in range(0, len(b64_data), BASE64_CHUNK_SIZE):
+            f.write(base64.b64decode(b64_data[i:i + BASE64_CHUNK_SIZE]))
+
+
+def write_file(filename: str, data: bytes) -> None:
+    """Write bytes to a file (run in an executor so it doesn't block the event loop)."""
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+async def save_screenshot(client: httpx.AsyncClient, screenshot_data: str, filename: str) -> bool:
     """
     Save screenshot data to a file. Handles both URLs and base64 data.
     
     Args:
+        client: The client used for screenshot downloads
         screenshot_data: Either a URL to the screenshot or base64 encoded image data
         filename: Output filename for the screenshot
+    
+    Returns:
+        True if the screenshot was saved; on failure an existing file is left untouched
     """
+    loop = asyncio.get_running_loop()
+    # Write next to the target and swap it in on success, so a failed save never clobbers an earlier screenshot
+    part_filename = f"{filename}.part"
     try:
         # Check if it's a URL (starts with http/https)
         if screenshot_data.startswith(('http://', 'https://')):
             print(f"Downloading screenshot from URL...")
-            response = requests.get(screenshot_data)
-            response.raise_for_status()
+            # Stream to disk so memory use doesn't grow with the image size
+            async with client.stream("GET", screenshot_data) as response:
+                response.raise_for_status()
+                f = await loop.run_in_executor(None, open, part_filename, 'wb')
+                try:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        await loop.run_in_executor(None, f.write, chunk)
+                finally:
+                    await loop.run_in_executor(None, f.close)
+            await loop.run_in_executor(None, os.replace, part_filename, filename)
             
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-            print(f"✓ Screenshot downloaded and saved to {filename}")
+            print(f"✓ Screenshot downloaded and saved to {filename} ({os.path.getsize(filename)} bytes)")
         else:
             # Handle base64 data
             # Remove data URL prefix if present
             if screenshot_data.startswith('data:image'):
                 screenshot_data = screenshot_data.split(',')[1]
             
-            image_data = base64.b64decode(screenshot_data)
-            with open(filename, 'wb') as f:
-                f.write(image_data)
-            print(f"✓ Screenshot saved to {filename}")
+            await loop.run_in_executor(None, write_base64_file, part_filename, screenshot_data)
+            await loop.run_in_executor(None, os.replace, part_filename, filename)
+            print(f"✓ Screenshot saved to {filename} ({os.path.getsize(filename)} bytes)")
+        return True
     except Exception as e:
         print(f"Error saving screenshot: {e}")
+        try:
+            os.remove(part_filename)
+        except OSError:
+            pass
+        return False
 
 
 def display_scrape_results(scrape_data: Dict) -> None:
@@ -144,7 +304,8 @@ def display_scrape_results(scrape_data: Dict) -> None:
         print("-" * 60)
     
     if screenshot:
-        print(f"\n📸 Screenshot: Available ({len(screenshot)} characters of base64 data)")
+        kind = "URL" if screenshot.startswith(('http://', 'https://')) else "inline base64"
+        print(f"\n📸 Screenshot: Available ({kind})")
     
     # Show metadata if available
     metadata = data.get('metadata', {})
@@ -155,6 +316,161 @@ def display_scrape_results(scrape_data: Dict) -> None:
         print(f"  Language: {metadata.get('language', 'N/A')}")
 
 
+async def save_scrape_results(client: httpx.AsyncClient, scrape_data: Dict, url: str,
+                              formats: list, output_dir: str,
+                              results_queue: Optional[asyncio.Queue] = None) -> None:
+    """
+    Save markdown and screenshot under <output_dir>/<url>/ along with the full response.
+    
+    Args:
+        client: The client used to download screenshot URLs
+        scrape_data: The response data from the Firecrawl API
+        url: The URL that was scraped
+        formats: The formats requested from Firecrawl
+        output_dir: Base directory to save output files
+        results_queue: Queue consumed by results_writer(); when None an indented
+            <output_dir>/<url>/response.json is written instead
+    """
+    loop = asyncio.get_running_loop()
+    
+    # Create URL-safe directory name
+    url_safe = url.removeprefix('https://').removeprefix('http://').translate(_URLSAFE_TABLE)
+    url_dir = os.path.join(output_dir, url_safe)
+    os.makedirs(url_dir, exist_ok=True)
+    
+    data = scrape_data.get('data', {})
+    
+    # Save markdown if available
+    if 'markdown' in formats and data.get('markdown'):
+        markdown_filename = os.path.join(url_dir, "content.md")
+        await loop.run_in_executor(None, write_file, markdown_filename, data['markdown'].encode('utf-8'))
+        print(f"✓ Markdown saved to {markdown_filename}")
+    
+    # Save screenshot if available
+    if wants_screenshot(formats) and data.get('screenshot'):
+        screenshot_filename = os.path.join(url_dir, "content.png")
+        saved = await save_screenshot(client, data['screenshot'], screenshot_filename)
+        # Inline base64 images are now in content.png; reference the file instead of serializing them again
+        if saved and not data['screenshot'].startswith(('http://', 'https://')):
+            scrape_data = {**scrape_data, 'data': {**data, 'screenshot': screenshot_filename}}
+    
+    # Save full JSON response
+    if results_queue is None:
+        json_filename = os.path.join(url_dir, "response.json")
+        json_bytes = orjson.dumps(scrape_data, option=orjson.OPT_INDENT_2)
+        await loop.run_in_executor(None, write_file, json_filename, json_bytes)
+        print(f"✓ Full response saved to {json_filename}")
+    else:
+        await results_queue.put(scrape_data)
+        print(f"✓ Full response queued for {os.path.join(output_dir, 'results.jsonl')}")
+
+
+async def results_writer(results_queue: asyncio.Queue, path: str) -> None:
+    """
+    Append queued responses to a JSONL file, one per line, until a None sentinel arrives.
+    Being the only writer keeps concurrent scrapes from interleaving partial records.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'ab') as f:
+        while True:
+            item = await results_queue.get()
+            if item is None:
+                break
+            f.write(orjson.dumps(item) + b"\n")
+
+
+async def scrape_one(client: httpx.AsyncClient, download_client: httpx.AsyncClient,
+                     sem: asyncio.Semaphore, url: str, formats: list, args,
+                     results_queue: Optional[asyncio.Queue] = None) -> Optional[Dict]:
+    """
+    Scrape, display and save a single URL, holding a semaphore slot while talking to Firecrawl.
+    Responses younger than --max-age are served from <output_dir>/.cache unless --no-cache is set.
+    Screenshot requests bypass the cache: inline screenshots are multi-MB and hosted
+    screenshot URLs can expire before the cached response does.
+    Errors are reported and swallowed so one bad URL doesn't cancel the rest of the batch.
+    """
+    loop = asyncio.get_running_loop()
+    cache_dir = os.path.join(args.output_dir, ".cache")
+    key = cache_key(url, formats, args.only_main_content)
+    use_cache = not args.no_cache and not wants_screenshot(formats)
+    try:
+        scrape_data = None
+        if use_cache:
+            scrape_data = await loop.run_in_executor(None, load_cached_scrape, cache_dir, key, args.max_age)
+            if scrape_data is not None:
+                print(f"✓ Using cached result for {url}")
+        
+        if scrape_data is None:
+            async with sem:
+                scrape_data = await scrape_url(
+                    client,
+                    url=url,
+                    only_main_content=args.only_main_content,
+                    max_age=args.max_age,
+                    wait_for=args.wait_for,
+                    formats=formats
+                )
+            if use_cache and scrape_data.get('success'):
+                try:
+                    await loop.run_in_executor(None, store_cached_scrape, cache_dir, key, scrape_data)
+                except OSError as e:
+                    print(f"⚠️  Could not cache result for {url}: {e}")
+        
+        display_scrape_results(scrape_data)
+        
+        # Save files unless --no-save is specified
+        if not args.no_save:
+            await save_scrape_results(download_client, scrape_data, url, formats, args.output_dir, results_queue)
+        return scrape_data
+    except Exception as e:
+        print(f"❌ Failed to scrape {url}: {e}")
+        return None
+
+
+async def scrape_all(urls: List[str], api_key: str, formats: list, args) -> List[Optional[Dict]]:
+    """Scrape all URLs concurrently, at most args.concurrency at a time."""
+    sem = asyncio.Semaphore(args.concurrency)
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+    
+    # All JSONL records go through a single writer task
+    results_queue = None
+    writer_task = None
+    if not args.no_save and not args.pretty:
+        results_queue = asyncio.Queue()
+        writer_task = asyncio.create_task(
+            results_writer(results_queue, os.path.join(args.output_dir, "results.jsonl"))
+        )
+    
+    try:
+        # Screenshots are downloaded from a third-party host, so they get a client without the API key
+        async with httpx.AsyncClient(http2=True, headers=headers, limits=_CLIENT_LIMITS,
+                                     timeout=_CLIENT_TIMEOUT) as client, \
+                httpx.AsyncClient(http2=True, limits=_CLIENT_LIMITS, timeout=_CLIENT_TIMEOUT,
+                                  follow_redirects=True) as download_client:
+            return await asyncio.gather(*[
+                scrape_one(client, download_client, sem, url, formats, args, results_queue) for url in urls
+            ])
+    finally:
+        if writer_task is not None:
+            await results_queue.put(None)
+            await writer_task
+
+
+def positive_int(value: str) -> int:
+    """argparse type for options that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -165,6 +481,10 @@ Examples:
   # Scrape URL for both markdown and screenshot (default behavior)
   python url_scraper.py "https://www.example.com"
   
+  # Scrape several URLs concurrently
+  python url_scraper.py "https://www.example.com" "https://www.example.org"
+  python url_scraper.py --urls-file urls.txt --concurrency 5
+  
   # Scrape URL for markdown content only
   python url_scraper.py "https://www.example.com" --markdown-only
   
@@ -176,13 +496,20 @@ Examples:
   
   # Scrape without saving files
   python url_scraper.py "https://www.example.com" --no-save
+
+  # Bypass the local cache in files/.cache
+  python url_scraper.py "https://www.example.com" --no-cache
         """
     )
     
-    parser.add_argument('url', help='URL to scrape')
-    parser.add_argument('--markdown-only', action='store_true', 
+    parser.add_argument('url', nargs='*', help='URL(s) to scrape')
+    parser.add_argument('--urls-file',
+                       help='File with one URL per line to scrape (blank lines and # comments are ignored)')
+    parser.add_argument('--concurrency', type=positive_int, default=DEFAULT_CONCURRENCY,
+                       help=f'Maximum number of URLs scraped at the same time (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--markdown-only', action='store_true',
                        help='Extract only markdown content (no screenshot)')
-    parser.add_argument('--screenshot-only', action='store_true', 
+    parser.add_argument('--screenshot-only', action='store_true',
                        help='Take only a screenshot (no markdown)')
     parser.add_argument('--only-main-content', action='store_true',
                        help='Extract only main content (skip ads, navigation, etc.)')
@@ -190,19 +517,39 @@ Examples:
                        help='Time to wait for page load in seconds (default: 5)')
     parser.add_argument('--max-age', type=int, default=172800000,
                        help='Maximum age of cached content in milliseconds (default: 172800000)')
-    parser.add_argument('--no-save', action='store_true', 
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always call Firecrawl instead of reusing a cached result younger than --max-age (screenshot requests are never cached)')
+    parser.add_argument('--no-save', action='store_true',
                        help='Do not save results to files (default: save to files/<url>/ directory)')
+    parser.add_argument('--pretty', action='store_true',
+                       help='Write an indented response.json per URL instead of appending to <output-dir>/results.jsonl')
     parser.add_argument('--output-dir', default='files',
                        help='Base directory to save output files (default: files)')
     
     return parser.parse_args()
 
 
+def read_urls_file(path: str) -> List[str]:
+    """Read URLs from a file, one per line, skipping blank lines and # comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
 def main():
     """Main function to run the CLI tool."""
     args = parse_arguments()
     
     try:
+        urls = list(args.url)
+        if args.urls_file:
+            urls.extend(read_urls_file(args.urls_file))
+        # Duplicates would be scraped twice and race writing the same output files
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            print("Error: Please provide at least one URL or --urls-file")
+            print("Use --help for more information")
+            sys.exit(1)
+        
         # Load API key from environment
         api_key = load_api_key()
         print("✓ API key loaded successfully")
@@ -228,47 +575,17 @@ def main():
                 }
             ]
         
-        print(f"Scraping URL: {args.url}")
+        print(f"Scraping {len(urls)} URL(s): {', '.join(urls)}")
         print(f"Formats: {[f if isinstance(f, str) else f['type'] for f in formats]}")
         
-        scrape_data = scrape_url(
-            url=args.url,
-            api_key=api_key,
-            only_main_content=args.only_main_content,
-            max_age=args.max_age,
-            wait_for=args.wait_for,
-            formats=formats
-        )
-        
-        display_scrape_results(scrape_data)
-        
-        # Save files unless --no-save is specified
-        if not args.no_save:
-            # Create URL-safe directory name
-            url_safe = args.url.replace('https://', '').replace('http://', '').replace('/', '_').replace('.', '_').replace(':', '_')
-            url_dir = os.path.join(args.output_dir, url_safe)
-            os.makedirs(url_dir, exist_ok=True)
-            
-            data = scrape_data.get('data', {})
-            
-            # Save markdown if available
-            if 'markdown' in formats and data.get('markdown'):
-                markdown_filename = os.path.join(url_dir, "content.md")
-                with open(markdown_filename, 'w', encoding='utf-8') as f:
-                    f.write(data['markdown'])
-                print(f"✓ Markdown saved to {markdown_filename}")
-            
-            # Save screenshot if available
-            if any(isinstance(f, dict) and f.get('type') == 'screenshot' for f in formats) and data.get('screenshot'):
-                screenshot_filename = os.path.join(url_dir, "content.png")
-                save_screenshot(data['screenshot'], screenshot_filename)
-            
-            # Save full JSON response
-            json_filename = os.path.join(url_dir, "response.json")
-            with open(json_filename, 'w', encoding='utf-8') as f:
-                json.dump(scrape_data, f, indent=2, ensure_ascii=False)
-            print(f"✓ Full response saved to {json_filename}")
+        results = asyncio.run(scrape_all(urls, api_key, formats, args))
         
+        if len(urls) > 1:
+            succeeded = sum(1 for r in results if r is not None)
+            print(f"\n✓ Scraped {succeeded}/{len(urls)} URL(s)")
+        if not any(r is not None for r in results):
+            sys.exit(1)
+    
     except ValueError as e:
         print(f"Configuration error: {e}")
         print("Please make sure you have FIRECRAWL_API_KEY in your .env file")